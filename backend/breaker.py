@@ -0,0 +1,93 @@
+"""Circuit breaker for bridge calls."""
+
+import threading
+import time
+
+
+class BridgeUnavailable(Exception):
+    """Raised when the breaker is open and a bridge call is refused."""
+
+
+class CircuitBreaker:
+    """Tracks consecutive failures and latency for a single bridge.
+
+    closed    -- calls pass through normally
+    open      -- calls fail fast until a background probe succeeds
+    half_open -- a probe is in flight; calls still fail fast
+    """
+
+    def __init__(self, failure_threshold: int = 3,
+                 slow_call_seconds: float = 4.0,
+                 reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_timeout = reset_timeout
+
+        self.state = "closed"
+        self.failures = 0
+        self.last_latency: float | None = None
+        self.opened_at: float | None = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        return self.state == "closed"
+
+    def record_success(self, latency: float) -> None:
+        with self._lock:
+            self.last_latency = latency
+            if latency > self.slow_call_seconds:
+                self._fail()
+                return
+            self.failures = 0
+            self.state = "closed"
+            self.opened_at = None
+
+    def record_failure(self, latency: float | None = None) -> None:
+        with self._lock:
+            if latency is not None:
+                self.last_latency = latency
+            self._fail()
+
+    def _fail(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                print(f"Bridge circuit opened after {self.failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def trip(self) -> None:
+        """Open the circuit straight away, e.g. when the bridge is known to be down."""
+        with self._lock:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def begin_probe(self) -> bool:
+        """Move open -> half_open once the reset timeout has passed."""
+        with self._lock:
+            if self.state != "open":
+                return False
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+            return True
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn through the breaker. Raises BridgeUnavailable when open."""
+        if not self.allow():
+            raise BridgeUnavailable("Bridge unreachable")
+        start = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure(time.monotonic() - start)
+            raise
+        self.record_success(time.monotonic() - start)
+        return result
+
+    def to_dict(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "last_latency": self.last_latency,
+        }
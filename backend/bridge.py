@@ -1,11 +1,27 @@
 """Hue Bridge connection manager."""
 
 import json
+import time
 from pathlib import Path
-from phue import Bridge, PhueRegistrationException
+
+import httpx
+from phue import Bridge, PhueRegistrationException, PhueRequestTimeout
+
+from backend import colors, discovery
+from backend.breaker import CircuitBreaker
+from backend.rooms import RoomIndex
+from backend.snapshot import SnapshotStore
 
 
 CONFIG_FILE = Path.home() / ".irispanel_config.json"
+PHUE_CONFIG_FILE = Path.home() / ".python_hue"
+
+# Minimum seconds between discovery runs while the bridge is unreachable
+RELOCATE_INTERVAL = 60
+
+# Per-request deadline; phue's own is a fixed 10 s, which holds a worker
+# thread that long for every call made while the bridge is going down.
+REQUEST_TIMEOUT = 2
 
 ROOM_CLASSES = [
     "Living room", "Kitchen", "Dining", "Bedroom", "Kids bedroom",
@@ -18,12 +34,45 @@ ROOM_CLASSES = [
 ]
 
 
+def _accepted(results) -> set[str]:
+    """Attributes a phue set_light/set_group result reports success for.
+
+    phue does not raise on Hue error payloads (unreachable light, bri sent
+    to a light that is off), so callers must check before trusting a write.
+    """
+    names = set()
+    for response in results or ():
+        for entry in response if isinstance(response, list) else ():
+            for path in entry.get("success", {}) if isinstance(entry, dict) else ():
+                names.add(path.rsplit("/", 1)[-1])
+    return names
+
+
+class TimedBridge(Bridge):
+    """phue Bridge whose requests give up after REQUEST_TIMEOUT."""
+
+    def request(self, mode="GET", address=None, data=None):
+        try:
+            resp = httpx.request(mode, f"http://{self.ip}{address}",
+                                 json=data, timeout=REQUEST_TIMEOUT)
+        except httpx.TimeoutException:
+            raise PhueRequestTimeout(None, f"{mode} Request to {self.ip}{address} timed out.")
+        return resp.json()
+
+
 class HueBridgeConnection:
     """Wraps phue Bridge with config persistence."""
 
     def __init__(self):
         self.bridge: Bridge | None = None
         self.bridge_ip: str | None = None
+        self.last_lights: dict = {}
+        self.last_groups: dict = {}
+        self.rooms = RoomIndex()
+        self.snapshot = SnapshotStore()
+        self.connecting = False
+        self._last_locate = 0.0
+        self._breakers: dict[str, CircuitBreaker] = {}
 
     # -- config --------------------------------------------------------
 
@@ -49,60 +98,231 @@ class HueBridgeConnection:
     def connected(self) -> bool:
         return self.bridge is not None
 
-    def connect(self, ip: str) -> None:
+    @property
+    def breaker(self) -> CircuitBreaker:
+        """Circuit breaker for the current bridge."""
+        return self._breakers.setdefault(self.bridge_ip, CircuitBreaker())
+
+    def probe(self) -> None:
+        """Background recovery check while the breaker is open."""
+        if not self.breaker.begin_probe():
+            return
+        start = time.monotonic()
+        try:
+            httpx.get(f"http://{self.bridge_ip}/api/config", timeout=3).raise_for_status()
+        except Exception:
+            self.breaker.record_failure(time.monotonic() - start)
+            self._relocate()
+            return
+        self.breaker.record_success(time.monotonic() - start)
+        if self.breaker.allow():
+            print(f"Bridge at {self.bridge_ip} reachable again")
+
+    def _relocate(self) -> None:
+        """Look for the bridge at a new IP while probes keep failing."""
+        if time.monotonic() - self._last_locate < RELOCATE_INTERVAL:
+            return
+        self._last_locate = time.monotonic()
+        bridge_id = self.load_config().get("bridge_id")
+        if not bridge_id:
+            return
+        ip = self.locate(bridge_id, hint=self.bridge_ip)
+        if ip is None or ip == self.bridge_ip:
+            return
+        print(f"Bridge {bridge_id} moved from {self.bridge_ip} to {ip}")
+        try:
+            self.connect(ip, username=self.bridge.username)
+        except Exception as e:
+            print(f"Reconnect to {ip} failed: {e}")
+
+    def connect(self, ip: str, username: str | None = None) -> None:
         """Connect to a Hue bridge. Raises on failure."""
-        b = Bridge(ip)
+        b = TimedBridge(ip, username=username)
         b.connect()
+        bridge_id = discovery.fetch_bridge_id(ip)
         self.bridge = b
         self.bridge_ip = ip
+        self._breakers[ip] = CircuitBreaker()
         config = self.load_config()
         config["bridge_ip"] = ip
+        config["username"] = b.username
+        if bridge_id:
+            config["bridge_id"] = bridge_id
+            config.setdefault("bridges", {})[bridge_id] = ip
         self.save_config(config)
 
+    def restore_snapshot(self) -> None:
+        """Seed the last known state from disk so it can be served stale."""
+        data = self.snapshot.load()
+        self.last_lights = data.get("lights", {})
+        self.last_groups = data.get("groups", {})
+        self._index_lights()
+        self._index_groups()
+
     def auto_connect(self) -> None:
-        """Try to reconnect using saved IP. Silently fails."""
+        """Reconnect to the saved bridge, re-finding it if its IP changed."""
+        self.connecting = True
+        try:
+            self._auto_connect()
+        finally:
+            self.connecting = False
+
+    def _auto_connect(self) -> None:
         config = self.load_config()
         saved_ip = config.get("bridge_ip")
-        if saved_ip:
-            try:
-                self.connect(saved_ip)
-                print(f"Auto-connected to bridge at {saved_ip}")
-            except Exception as e:
-                print(f"Auto-connect failed: {e}")
+        if not saved_ip:
+            return
+        ip = saved_ip
+        unreachable = False
+        bridge_id = config.get("bridge_id")
+        if bridge_id and discovery.fetch_bridge_id(saved_ip) != bridge_id:
+            self._last_locate = time.monotonic()
+            found = self.locate(bridge_id, hint=saved_ip)
+            if found is None:
+                # Often the bridge is still booting after a power cut: connect
+                # anyway and let the breaker and background probe take over.
+                print(f"Bridge {bridge_id} not found; will keep trying {saved_ip}")
+                unreachable = True
+            else:
+                ip = found
+                if ip != saved_ip:
+                    print(f"Bridge {bridge_id} moved from {saved_ip} to {ip}")
+        username = config.get("username") or self._phue_username(saved_ip)
+        try:
+            self.connect(ip, username=username)
+            print(f"Auto-connected to bridge at {ip}")
+        except Exception as e:
+            print(f"Auto-connect failed: {e}")
+            return
+        if unreachable:
+            self.breaker.trip()
+
+    def locate(self, bridge_id: str, hint: str | None = None) -> str | None:
+        """Find the current IP of a known bridge ID."""
+        found = discovery.discover_sync(want=bridge_id, hint=hint)
+        self.remember_bridges(found)
+        return found.get(bridge_id)
+
+    def remember_bridges(self, found: dict[str, str]) -> None:
+        """Merge discovery results into the cached bridge ID -> IP map."""
+        if not found:
+            return
+        config = self.load_config()
+        config.setdefault("bridges", {}).update(found)
+        self.save_config(config)
+
+    def _phue_username(self, ip: str) -> str | None:
+        # phue keys its saved credentials by IP; fall back to them for
+        # configs written before the username was stored here.
+        try:
+            with open(PHUE_CONFIG_FILE, "r") as f:
+                return json.load(f)[ip]["username"]
+        except Exception:
+            return None
 
     # -- lights --------------------------------------------------------
 
     def get_lights(self) -> dict:
-        light_objects = self.bridge.get_light_objects("id")
+        self.last_lights = self.breaker.call(self._fetch_lights)
+        self._index_lights()
+        self.snapshot.update(lights=self.last_lights)
+        return self.last_lights
+
+    def _index_lights(self) -> None:
+        self.rooms.update_lights({
+            lid: (light["on"], light["brightness"])
+            for lid, light in self.last_lights.items()
+        })
+
+    def stale_lights(self) -> dict:
+        return {lid: {**light, "stale": True} for lid, light in self.last_lights.items()}
+
+    def _fetch_lights(self) -> dict:
+        # One GET /lights for every light, so the breaker's slow-call limit
+        # measures a single bridge round trip however many lights there are
+        lights = self.bridge.get_light()
         result = {}
-        for light_id, light in light_objects.items():
-            state = self.bridge.get_light(light_id)
+        for lid, state in lights.items():
+            light_id = int(lid)
             ls = state.get("state", {})
+            control = state.get("capabilities", {}).get("control", {})
             result[light_id] = {
                 "id": light_id,
-                "name": light.name,
+                "name": state.get("name", f"Light {lid}"),
                 "on": ls.get("on", False),
                 "brightness": ls.get("bri", 254),
                 "reachable": ls.get("reachable", False),
                 "has_color": "hue" in ls or "xy" in ls,
                 "hue": ls.get("hue"),
                 "sat": ls.get("sat"),
+                "xy": ls.get("xy"),
+                "ct": ls.get("ct"),
+                "colormode": ls.get("colormode"),
+                "gamut": control.get("colorgamuttype"),
             }
+        colors.annotate(result)
         return result
 
     def update_light(self, light_id: int, *, on: bool | None = None,
                      brightness: int | None = None, hue: int | None = None,
-                     sat: int | None = None) -> None:
+                     sat: int | None = None, xy: list[float] | None = None,
+                     ct: int | None = None, color: str | None = None,
+                     transitiontime: int | None = None) -> None:
+        """Set light state. color is "#rrggbb", converted within the light's gamut."""
+        if color is not None or xy is not None:
+            gamut = self.gamut_of(light_id) or colors.DEFAULT_GAMUT
+            if color is not None:
+                xy = list(colors.hex_to_xy(color, gamut))
+            else:
+                xy = colors.checked_xy(xy, gamut)
+        if ct is not None:
+            colors.check_ct(ct)
+        ok = self.breaker.call(self._set_light, light_id, on=on,
+                               brightness=brightness, hue=hue, sat=sat, xy=xy,
+                               ct=ct, transitiontime=transitiontime)
+        self.rooms.apply(light_id, on=on if "on" in ok else None,
+                         brightness=brightness if "bri" in ok else None)
+
+    def _set_light(self, light_id: int, *, on: bool | None,
+                   brightness: int | None, hue: int | None,
+                   sat: int | None, xy: list[float] | None,
+                   ct: int | None, transitiontime: int | None) -> set[str]:
+        """Send the changes; returns the attributes the bridge accepted."""
+        results = []
         if on is not None:
-            self.bridge.set_light(light_id, "on", on)
+            results += self.bridge.set_light(light_id, "on", on)
         if brightness is not None:
-            self.bridge.set_light(light_id, "bri", brightness)
+            results += self.bridge.set_light(light_id, "bri", brightness,
+                                             transitiontime=transitiontime)
         if hue is not None and sat is not None:
-            self.bridge.set_light(light_id, {"hue": hue, "sat": sat})
+            results += self.bridge.set_light(light_id, {"hue": hue, "sat": sat},
+                                             transitiontime=transitiontime)
+        if xy is not None:
+            results += self.bridge.set_light(light_id, "xy", xy,
+                                             transitiontime=transitiontime)
+        if ct is not None:
+            results += self.bridge.set_light(light_id, "ct", ct,
+                                             transitiontime=transitiontime)
+        return _accepted(results)
 
     # -- groups --------------------------------------------------------
 
     def get_groups(self) -> dict:
+        self.last_groups = self.breaker.call(self._fetch_groups)
+        self._index_groups()
+        self.snapshot.update(groups=self.last_groups)
+        return self.rooms.annotate(self.last_groups)
+
+    def _index_groups(self) -> None:
+        self.rooms.set_membership({
+            gid: group["lights"] for gid, group in self.last_groups.items()
+        })
+
+    def stale_groups(self) -> dict:
+        groups = self.rooms.annotate(self.last_groups)
+        return {gid: {**group, "stale": True} for gid, group in groups.items()}
+
+    def _fetch_groups(self) -> dict:
         groups = self.bridge.get_group()
         result = {}
         for gid, gdata in groups.items():
@@ -120,23 +340,77 @@ class HueBridgeConnection:
                 "has_color": "hue" in action or "xy" in action,
                 "hue": action.get("hue"),
                 "sat": action.get("sat"),
+                "xy": action.get("xy"),
+                "ct": action.get("ct"),
+                "colormode": action.get("colormode"),
             }
+        colors.annotate(result, {
+            gid: self._lights_gamut(group["lights"]) for gid, group in result.items()
+        })
         return result
 
+    def gamut_of(self, light_id) -> str | None:
+        light = self.last_lights.get(light_id) or self.last_lights.get(str(light_id))
+        if light is None and str(light_id).isdigit():
+            light = self.last_lights.get(int(light_id))
+        return light.get("gamut") if light else None
+
+    def _lights_gamut(self, light_ids) -> str | None:
+        # Groups have no gamut of their own; use their first colour light's
+        return next(filter(None, map(self.gamut_of, light_ids)), None)
+
     def update_group(self, group_id: int, *, on: bool | None = None,
                      brightness: int | None = None, hue: int | None = None,
                      sat: int | None = None, name: str | None = None,
                      lights: list[str] | None = None,
-                     room_class: str | None = None) -> None:
+                     room_class: str | None = None,
+                     xy: list[float] | None = None, ct: int | None = None,
+                     color: str | None = None,
+                     transitiontime: int | None = None) -> None:
+        if color is not None or xy is not None:
+            members = self.last_groups.get(str(group_id), {}).get("lights", [])
+            gamut = self._lights_gamut(members) or colors.DEFAULT_GAMUT
+            if color is not None:
+                xy = list(colors.hex_to_xy(color, gamut))
+            else:
+                xy = colors.checked_xy(xy, gamut)
+        if ct is not None:
+            colors.check_ct(ct)
+        ok = self.breaker.call(self._set_group, group_id, on=on,
+                               brightness=brightness, hue=hue, sat=sat, name=name,
+                               lights=lights, room_class=room_class, xy=xy, ct=ct,
+                               transitiontime=transitiontime)
+        # The bridge accepts a group action even when some members are
+        # unreachable; those lights keep their last polled state.
+        unreachable = {str(lid) for lid, light in self.last_lights.items()
+                       if not light.get("reachable", True)}
+        self.rooms.apply_group(group_id, on=on if "on" in ok else None,
+                               brightness=brightness if "bri" in ok else None,
+                               skip=unreachable)
+
+    def _set_group(self, group_id: int, *, on: bool | None,
+                   brightness: int | None, hue: int | None, sat: int | None,
+                   name: str | None, lights: list[str] | None,
+                   room_class: str | None, xy: list[float] | None,
+                   ct: int | None, transitiontime: int | None) -> set[str]:
+        """Send the changes; returns the action attributes the bridge accepted."""
+        results = []
         if on is not None:
-            self.bridge.set_group(group_id, "on", on)
+            results += self.bridge.set_group(group_id, "on", on) or []
         if brightness is not None:
-            self.bridge.set_group(group_id, "bri", brightness)
+            results += self.bridge.set_group(group_id, "bri", brightness,
+                                             transitiontime=transitiontime) or []
         if hue is not None and sat is not None:
-            self.bridge.set_group(group_id, {"hue": hue, "sat": sat})
+            results += self.bridge.set_group(group_id, {"hue": hue, "sat": sat},
+                                             transitiontime=transitiontime) or []
+        if xy is not None:
+            results += self.bridge.set_group(group_id, "xy", xy,
+                                             transitiontime=transitiontime) or []
+        if ct is not None:
+            results += self.bridge.set_group(group_id, "ct", ct,
+                                             transitiontime=transitiontime) or []
 
         if name is not None or lights is not None or room_class is not None:
-            import httpx
             url = f"http://{self.bridge_ip}/api/{self.bridge.username}/groups/{group_id}"
             attrs: dict = {}
             if name is not None:
@@ -147,12 +421,14 @@ class HueBridgeConnection:
                 attrs["class"] = room_class
             if attrs:
                 httpx.put(url, json=attrs)
+        return _accepted(results)
 
     def create_group(self, name: str, lights: list[str],
                      room_class: str = "Other"):
-        return self.bridge.create_group(
-            name, lights, group_type="Room", room_class=room_class
+        return self.breaker.call(
+            self.bridge.create_group,
+            name, lights, group_type="Room", room_class=room_class,
         )
 
     def delete_group(self, group_id: int) -> None:
-        self.bridge.delete_group(group_id)
+        self.breaker.call(self.bridge.delete_group, group_id)
@@ -0,0 +1,193 @@
+"""Colour conversion between Hue colour spaces and display hex.
+
+Lights report colour as xy, colour temperature (ct, in mireds) or hue/sat
+depending on their colormode. annotate() turns a whole lights/groups
+snapshot into ready-to-render "#rrggbb" values in one pass. Results come
+from lookup tables: ct is precomputed for the full 153-500 mired range,
+and xy and hue/sat are memoized per gamut on a quantized grid, so a
+steady-state poll does no colour maths at all.
+"""
+
+import math
+import re
+from functools import lru_cache
+
+# Colour gamut triangles (red, green, blue corners) from the Hue API docs
+GAMUTS = {
+    "A": ((0.704, 0.296), (0.2151, 0.7106), (0.138, 0.08)),
+    "B": ((0.675, 0.322), (0.409, 0.518), (0.167, 0.04)),
+    "C": ((0.6915, 0.3083), (0.17, 0.7), (0.1532, 0.0475)),
+}
+DEFAULT_GAMUT = "C"
+
+CT_MIN = 153
+CT_MAX = 500
+
+XY_STEP = 1000  # xy quantized to 0.001 for table lookups
+
+
+def _to_hex(r: float, g: float, b: float) -> str:
+    return "#" + "".join(f"{round(min(max(v, 0.0), 1.0) * 255):02x}" for v in (r, g, b))
+
+
+def _gamma(v: float) -> float:
+    return 12.92 * v if v <= 0.0031308 else 1.055 * v ** (1 / 2.4) - 0.055
+
+
+def _ungamma(v: float) -> float:
+    return v / 12.92 if v <= 0.04045 else ((v + 0.055) / 1.055) ** 2.4
+
+
+# -- gamut clamping ----------------------------------------------------
+
+def _cross(a, b) -> float:
+    return a[0] * b[1] - a[1] * b[0]
+
+
+def _in_gamut(p, gamut) -> bool:
+    r, g, b = gamut
+    v1 = (g[0] - r[0], g[1] - r[1])
+    v2 = (b[0] - r[0], b[1] - r[1])
+    q = (p[0] - r[0], p[1] - r[1])
+    d = _cross(v1, v2)
+    s = _cross(q, v2) / d
+    t = _cross(v1, q) / d
+    return s >= 0 and t >= 0 and s + t <= 1
+
+
+def _closest_on_segment(p, a, b):
+    ab = (b[0] - a[0], b[1] - a[1])
+    t = ((p[0] - a[0]) * ab[0] + (p[1] - a[1]) * ab[1]) / (ab[0] ** 2 + ab[1] ** 2)
+    t = min(max(t, 0.0), 1.0)
+    return (a[0] + t * ab[0], a[1] + t * ab[1])
+
+
+def clamp_xy(x: float, y: float, gamut: str = DEFAULT_GAMUT) -> tuple[float, float]:
+    """Nearest point to (x, y) that the gamut can reproduce."""
+    corners = GAMUTS.get(gamut, GAMUTS[DEFAULT_GAMUT])
+    if _in_gamut((x, y), corners):
+        return x, y
+    r, g, b = corners
+    candidates = [_closest_on_segment((x, y), p, q) for p, q in ((r, g), (g, b), (b, r))]
+    return min(candidates, key=lambda c: math.hypot(c[0] - x, c[1] - y))
+
+
+def checked_xy(xy, gamut: str = DEFAULT_GAMUT) -> list[float]:
+    """Validate a client-supplied [x, y] and clamp it into the gamut."""
+    if len(xy) != 2 or not all(0 <= v <= 1 for v in xy):
+        raise ValueError("xy must be two values between 0 and 1")
+    x, y = clamp_xy(*xy, gamut)
+    return [round(x, 4), round(y, 4)]
+
+
+def check_ct(mired: int) -> None:
+    if not CT_MIN <= mired <= CT_MAX:
+        raise ValueError(f"ct must be between {CT_MIN} and {CT_MAX}")
+
+
+# -- conversions -------------------------------------------------------
+
+def xy_to_rgb(x: float, y: float, gamut: str = DEFAULT_GAMUT) -> tuple[float, float, float]:
+    x, y = clamp_xy(x, y, gamut)
+    if y <= 0:
+        return (0.0, 0.0, 0.0)
+    big_y = 1.0
+    big_x = big_y / y * x
+    big_z = big_y / y * (1 - x - y)
+    r = big_x * 1.656492 - big_y * 0.354851 - big_z * 0.255038
+    g = -big_x * 0.707196 + big_y * 1.655397 + big_z * 0.036152
+    b = big_x * 0.051713 - big_y * 0.121364 + big_z * 1.011530
+    r, g, b = (max(v, 0.0) for v in (r, g, b))
+    peak = max(r, g, b)
+    if peak > 1:
+        r, g, b = r / peak, g / peak, b / peak
+    return tuple(_gamma(v) for v in (r, g, b))
+
+
+def rgb_to_xy(r: float, g: float, b: float, gamut: str = DEFAULT_GAMUT) -> tuple[float, float]:
+    r, g, b = (_ungamma(v) for v in (r, g, b))
+    big_x = r * 0.664511 + g * 0.154324 + b * 0.162028
+    big_y = r * 0.283881 + g * 0.668433 + b * 0.047685
+    big_z = r * 0.000088 + g * 0.072310 + b * 0.986039
+    total = big_x + big_y + big_z
+    if total == 0:
+        return clamp_xy(0.3227, 0.329, gamut)
+    x, y = clamp_xy(big_x / total, big_y / total, gamut)
+    return round(x, 4), round(y, 4)
+
+
+def ct_to_rgb(mired: int) -> tuple[float, float, float]:
+    """Approximate sRGB of a black body at 1e6 / mired kelvin."""
+    temp = 1_000_000 / mired / 100
+    if temp <= 66:
+        r = 255.0
+        g = 99.4708025861 * math.log(temp) - 161.1195681661
+        b = 0.0 if temp <= 19 else 138.5177312231 * math.log(temp - 10) - 305.0447927307
+    else:
+        r = 329.698727446 * (temp - 60) ** -0.1332047592
+        g = 288.1221695283 * (temp - 60) ** -0.0755148492
+        b = 255.0
+    return tuple(min(max(v, 0.0), 255.0) / 255 for v in (r, g, b))
+
+
+def hs_to_rgb(hue: int, sat: int) -> tuple[float, float, float]:
+    h = (hue / 65535) * 6
+    s = sat / 254
+    i = math.floor(h) % 6
+    f = h - math.floor(h)
+    p, q, t = 1 - s, 1 - f * s, 1 - (1 - f) * s
+    return [(1, t, p), (q, 1, p), (p, 1, t), (p, q, 1), (t, p, 1), (1, p, q)][i]
+
+
+def hex_to_rgb(value: str) -> tuple[float, float, float]:
+    m = re.fullmatch(r"#?([0-9a-fA-F]{2})([0-9a-fA-F]{2})([0-9a-fA-F]{2})", value.strip())
+    if not m:
+        raise ValueError(f"Invalid colour {value!r}")
+    return tuple(int(c, 16) / 255 for c in m.groups())
+
+
+def hex_to_xy(value: str, gamut: str = DEFAULT_GAMUT) -> tuple[float, float]:
+    return rgb_to_xy(*hex_to_rgb(value), gamut)
+
+
+# -- tables ------------------------------------------------------------
+
+CT_TABLE = {m: _to_hex(*ct_to_rgb(m)) for m in range(CT_MIN, CT_MAX + 1)}
+
+
+@lru_cache(maxsize=8192)
+def _xy_hex(gamut: str, xq: int, yq: int) -> str:
+    return _to_hex(*xy_to_rgb(xq / XY_STEP, yq / XY_STEP, gamut))
+
+
+@lru_cache(maxsize=8192)
+def _hs_hex(hue: int, sat: int) -> str:
+    return _to_hex(*hs_to_rgb(hue, sat))
+
+
+def display_color(state: dict, gamut: str | None = None) -> str | None:
+    """"#rrggbb" for a light state or group action, or None if it has no colour."""
+    mode = state.get("colormode")
+    xy = state.get("xy")
+    ct = state.get("ct")
+    hue, sat = state.get("hue"), state.get("sat")
+    if mode is None:
+        mode = "xy" if xy else "hs" if hue is not None else "ct" if ct else None
+    if mode == "xy" and xy:
+        return _xy_hex(gamut or DEFAULT_GAMUT, round(xy[0] * XY_STEP), round(xy[1] * XY_STEP))
+    if mode == "ct" and ct:
+        return CT_TABLE[min(max(int(ct), CT_MIN), CT_MAX)]
+    if mode == "hs" and hue is not None:
+        return _hs_hex(int(hue), int(sat if sat is not None else 254))
+    return None
+
+
+def annotate(items: dict, gamuts: dict | None = None) -> None:
+    """Set "color" on every light or group in a snapshot, in place.
+
+    gamuts maps item ID to gamut letter; items without one use the
+    item's own "gamut" field, then DEFAULT_GAMUT.
+    """
+    gamuts = gamuts or {}
+    for key, item in items.items():
+        item["color"] = display_color(item, gamuts.get(key) or item.get("gamut"))
@@ -0,0 +1,188 @@
+"""Hue bridge discovery.
+
+Runs N-UPnP (the Hue cloud endpoint), mDNS, SSDP and a bounded scan of the
+local /24 concurrently. Every candidate is confirmed by reading the bridge's
+unauthenticated /api/config, so results map a bridge ID to an IP that
+answered just now.
+"""
+
+import asyncio
+import ipaddress
+import socket
+import struct
+
+import httpx
+
+NUPNP_URL = "https://discovery.meethue.com/"
+MDNS_ADDR = ("224.0.0.251", 5353)
+SSDP_ADDR = ("239.255.255.250", 1900)
+SSDP_SEARCH = (
+    "M-SEARCH * HTTP/1.1\r\n"
+    "HOST: 239.255.255.250:1900\r\n"
+    'MAN: "ssdp:discover"\r\n'
+    "MX: 2\r\n"
+    "ST: urn:schemas-upnp-org:device:basic:1\r\n\r\n"
+).encode()
+
+SCAN_CONCURRENCY = 128
+PROBE_TIMEOUT = 0.8
+
+
+def _mdns_query(service: str = "_hue._tcp.local") -> bytes:
+    header = struct.pack("!HHHHHH", 0, 0, 1, 0, 0, 0)
+    qname = b"".join(
+        bytes([len(label)]) + label.encode() for label in service.split(".")
+    ) + b"\x00"
+    # PTR question with the unicast-response bit so replies come to our port
+    return header + qname + struct.pack("!HH", 12, 0x8001)
+
+
+def local_ip() -> str | None:
+    """Address of the interface used for the default route."""
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect(("10.255.255.255", 1))
+        return s.getsockname()[0]
+    except OSError:
+        return None
+    finally:
+        s.close()
+
+
+def fetch_bridge_id(ip: str, timeout: float = 2.0) -> str | None:
+    """Bridge ID served at ip, or None if nothing answers there."""
+    try:
+        resp = httpx.get(f"http://{ip}/api/config", timeout=timeout)
+        bridge_id = resp.json().get("bridgeid")
+    except Exception:
+        return None
+    return bridge_id.upper() if bridge_id else None
+
+
+class _Datagrams(asyncio.DatagramProtocol):
+    def __init__(self, on_reply):
+        self.on_reply = on_reply
+
+    def datagram_received(self, data, addr):
+        self.on_reply(data, addr[0])
+
+
+class _Discovery:
+    """One discovery run; stops early once the wanted bridge is seen."""
+
+    def __init__(self, client: httpx.AsyncClient, want: str | None):
+        self.client = client
+        self.want = want.upper() if want else None
+        self.found: dict[str, str] = {}
+        self.done = asyncio.Event()
+        self._checked: set[str] = set()
+        self._limit = asyncio.Semaphore(SCAN_CONCURRENCY)
+        self._tasks: set[asyncio.Task] = set()
+
+    def add(self, bridge_id: str, ip: str) -> None:
+        bridge_id = bridge_id.upper()
+        self.found[bridge_id] = ip
+        if bridge_id == self.want:
+            self.done.set()
+
+    async def check(self, ip: str) -> None:
+        if ip in self._checked:
+            return
+        self._checked.add(ip)
+        async with self._limit:
+            try:
+                resp = await self.client.get(f"http://{ip}/api/config")
+                bridge_id = resp.json().get("bridgeid")
+            except Exception:
+                return
+        if bridge_id:
+            self.add(bridge_id, ip)
+
+    def check_later(self, ip: str) -> None:
+        task = asyncio.ensure_future(self.check(ip))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def nupnp(self) -> None:
+        try:
+            resp = await self.client.get(NUPNP_URL, timeout=3.0)
+            entries = resp.json()
+        except Exception:
+            return
+        await asyncio.gather(*(
+            self.check(e["internalipaddress"])
+            for e in entries if isinstance(e, dict) and e.get("internalipaddress")
+        ))
+
+    async def multicast(self, addr: tuple[str, int], payload: bytes,
+                        marker: bytes | None, listen: float) -> None:
+        def on_reply(data: bytes, ip: str) -> None:
+            if marker is None or marker in data:
+                self.check_later(ip)
+
+        loop = asyncio.get_running_loop()
+        try:
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: _Datagrams(on_reply),
+                family=socket.AF_INET, local_addr=("0.0.0.0", 0),
+            )
+        except OSError:
+            return
+        try:
+            transport.sendto(payload, addr)
+            await asyncio.sleep(listen)
+        except OSError:
+            pass
+        finally:
+            transport.close()
+
+    async def scan(self, hint: str | None) -> None:
+        ip = local_ip()
+        if ip is None:
+            return
+        net = ipaddress.ip_network(f"{ip}/24", strict=False)
+        hosts = [str(h) for h in net.hosts() if str(h) != ip]
+        try:
+            centre = ipaddress.ip_address(hint) if hint else None
+        except ValueError:
+            centre = None
+        if centre is not None and centre in net:
+            # DHCP usually hands out a nearby address; look there first
+            hosts.sort(key=lambda h: abs(int(ipaddress.ip_address(h)) - int(centre)))
+        await asyncio.gather(*(self.check(h) for h in hosts))
+
+    async def run(self, hint: str | None, timeout: float) -> dict[str, str]:
+        # Stop listening early enough for late replies to be confirmed
+        listen = max(timeout - PROBE_TIMEOUT, 0.5)
+        jobs = [
+            asyncio.ensure_future(self.nupnp()),
+            asyncio.ensure_future(self.multicast(MDNS_ADDR, _mdns_query(), None, listen)),
+            asyncio.ensure_future(self.multicast(SSDP_ADDR, SSDP_SEARCH, b"IpBridge", listen)),
+            asyncio.ensure_future(self.scan(hint)),
+        ]
+        finished = asyncio.ensure_future(asyncio.gather(*jobs))
+        waiter = asyncio.ensure_future(self.done.wait())
+        await asyncio.wait({finished, waiter}, timeout=timeout,
+                           return_when=asyncio.FIRST_COMPLETED)
+        for task in (*jobs, finished, waiter, *self._tasks):
+            task.cancel()
+        await asyncio.gather(finished, waiter, *self._tasks, return_exceptions=True)
+        return dict(self.found)
+
+
+async def discover(want: str | None = None, hint: str | None = None,
+                   timeout: float = 3.0) -> dict[str, str]:
+    """Find bridges on the LAN. Returns {bridge_id: ip}.
+
+    With want set, returns as soon as that bridge ID answers. hint is a
+    previously known IP; the subnet scan starts around it.
+    """
+    limits = httpx.Limits(max_connections=SCAN_CONCURRENCY)
+    async with httpx.AsyncClient(timeout=PROBE_TIMEOUT, limits=limits) as client:
+        return await _Discovery(client, want).run(hint, timeout)
+
+
+def discover_sync(want: str | None = None, hint: str | None = None,
+                  timeout: float = 3.0) -> dict[str, str]:
+    """Blocking wrapper for discover(); call from a worker thread."""
+    return asyncio.run(discover(want=want, hint=hint, timeout=timeout))
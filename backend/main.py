@@ -1,5 +1,6 @@
 """FastAPI application for The Iris Panel."""
 
+import asyncio
 from contextlib import asynccontextmanager
 from pathlib import Path
 
@@ -10,17 +11,37 @@ from fastapi.staticfiles import StaticFiles
 from starlette.middleware.base import BaseHTTPMiddleware
 
 from backend.bridge import HueBridgeConnection
-from backend.routes import connection, lights, groups
+from backend.routes import admin, connection, lights, groups, schedules
+from backend.scheduler import Scheduler
 
 FRONTEND_DIR = Path(__file__).resolve().parent.parent / "frontend"
 
+PROBE_INTERVAL = 5
+
 hub = HueBridgeConnection()
+scheduler = Scheduler(hub)
+
+
+async def probe_bridge():
+    """Check an open circuit for recovery without blocking requests."""
+    while True:
+        await asyncio.sleep(PROBE_INTERVAL)
+        if hub.connected and not hub.breaker.allow():
+            await asyncio.to_thread(hub.probe)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    hub.auto_connect()
+    # Serve the last snapshot straight away and reconnect in the background
+    await asyncio.to_thread(hub.restore_snapshot)
+    connecting = asyncio.create_task(asyncio.to_thread(hub.auto_connect))
+    prober = asyncio.create_task(probe_bridge())
+    missed = await asyncio.to_thread(scheduler.load)
+    runner = asyncio.create_task(scheduler.run(missed, ready=connecting))
     yield
+    prober.cancel()
+    runner.cancel()
+    await asyncio.to_thread(hub.snapshot.flush)
 
 
 app = FastAPI(title="The Iris Panel", lifespan=lifespan)
@@ -44,6 +65,8 @@ app.add_middleware(
 app.include_router(connection.router, prefix="/api")
 app.include_router(lights.router, prefix="/api")
 app.include_router(groups.router, prefix="/api")
+app.include_router(schedules.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
 
 app.mount("/static", StaticFiles(directory=FRONTEND_DIR / "static"), name="static")
 
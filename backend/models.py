@@ -12,6 +12,9 @@ class LightUpdate(BaseModel):
     brightness: int | None = None
     hue: int | None = None
     sat: int | None = None
+    xy: list[float] | None = None
+    ct: int | None = None
+    color: str | None = None
 
 
 class GroupUpdate(BaseModel):
@@ -19,6 +22,9 @@ class GroupUpdate(BaseModel):
     brightness: int | None = None
     hue: int | None = None
     sat: int | None = None
+    xy: list[float] | None = None
+    ct: int | None = None
+    color: str | None = None
     name: str | None = None
     lights: list[str] | None = None
     room_class: str | None = None
@@ -28,3 +34,37 @@ class CreateGroupRequest(BaseModel):
     name: str
     lights: list[str]
     room_class: str = "Other"
+
+
+class ScheduleTrigger(BaseModel):
+    type: str
+    expr: str | None = None
+    event: str | None = None
+    offset: int = 0
+
+
+class ScheduleAction(BaseModel):
+    target: str = "light"
+    id: int
+    on: bool | None = None
+    brightness: int | None = None
+    hue: int | None = None
+    sat: int | None = None
+    xy: list[float] | None = None
+    ct: int | None = None
+    color: str | None = None
+    transition: float | None = None
+    ramp_from: int | None = None
+
+
+class CreateScheduleRequest(BaseModel):
+    name: str
+    trigger: ScheduleTrigger
+    action: ScheduleAction
+    enabled: bool = True
+    catch_up: int = 3600
+
+
+class LocationRequest(BaseModel):
+    lat: float
+    lon: float
@@ -0,0 +1,57 @@
+"""Sampling profiler for the live process.
+
+Walks every thread's stack with sys._current_frames() at a fixed rate and
+returns the counts in the folded ("collapsed stack") format read by
+flamegraph.pl, speedscope and similar tools. Worker threads started by
+asyncio.to_thread are included; they are grouped under one root so the
+pool shows up as a single tower.
+"""
+
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is already being captured."""
+
+
+def _thread_label(name: str) -> str:
+    # asyncio_0, asyncio_1, ... -> asyncio
+    return re.sub(r"_\d+$", "", name).replace(";", ":").replace(" ", "_")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})".replace(";", ":")
+
+
+def sample(seconds: float, hz: int) -> str:
+    """Sample all threads for seconds at hz. Blocks; run it in a thread."""
+    if not _lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    try:
+        own = threading.get_ident()
+        interval = 1 / hz
+        counts: Counter = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(_thread_label(names.get(ident, f"thread-{ident}")))
+                counts[";".join(reversed(stack))] += 1
+            time.sleep(interval)
+        return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+    finally:
+        _lock.release()
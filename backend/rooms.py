@@ -0,0 +1,134 @@
+"""Light -> group membership index with per-group aggregates."""
+
+import threading
+
+
+class RoomIndex:
+    """Keeps any_on / all_on / average brightness for every group.
+
+    Membership is diffed when groups are refetched, and a light state change
+    only touches the groups that contain that light, so a poll in which a
+    few lights changed costs O(changed lights x their groups).
+    """
+
+    def __init__(self):
+        self.groups_of: dict[str, set[str]] = {}
+        self.members: dict[str, set[str]] = {}
+        self.states: dict[str, tuple[bool, int]] = {}
+        # gid -> [known lights, lights on, brightness sum, brightness sum of lights on]
+        self._totals: dict[str, list[int]] = {}
+        # get_lights and get_groups run in separate worker threads
+        self._lock = threading.RLock()
+
+    # -- membership ----------------------------------------------------
+
+    def set_membership(self, groups: dict[str, list]) -> None:
+        """Sync with a full {group id: light ids} mapping."""
+        with self._lock:
+            for gid in list(self.members):
+                if gid not in groups:
+                    for lid in list(self.members[gid]):
+                        self._unlink(gid, lid)
+                    del self.members[gid]
+                    del self._totals[gid]
+
+            for gid, lights in groups.items():
+                gid = str(gid)
+                wanted = {str(lid) for lid in lights}
+                current = self.members.setdefault(gid, set())
+                self._totals.setdefault(gid, [0, 0, 0, 0])
+                for lid in current - wanted:
+                    self._unlink(gid, lid)
+                for lid in wanted - current:
+                    self._link(gid, lid)
+
+    def _link(self, gid: str, lid: str) -> None:
+        self.members[gid].add(lid)
+        self.groups_of.setdefault(lid, set()).add(gid)
+        if lid in self.states:
+            self._add(gid, self.states[lid], 1)
+
+    def _unlink(self, gid: str, lid: str) -> None:
+        self.members[gid].discard(lid)
+        groups = self.groups_of.get(lid)
+        if groups is not None:
+            groups.discard(gid)
+            if not groups:
+                del self.groups_of[lid]
+        if lid in self.states:
+            self._add(gid, self.states[lid], -1)
+
+    # -- light state ---------------------------------------------------
+
+    def update_lights(self, states: dict) -> None:
+        """Sync with a full {light id: (on, brightness)} snapshot."""
+        with self._lock:
+            states = {str(lid): state for lid, state in states.items()}
+            for lid in list(self.states):
+                if lid not in states:
+                    self._set(lid, None)
+            for lid, state in states.items():
+                self._set(lid, state)
+
+    def apply(self, light_id, on: bool | None = None,
+              brightness: int | None = None) -> None:
+        """Apply a single write that the bridge has accepted."""
+        with self._lock:
+            lid = str(light_id)
+            old = self.states.get(lid)
+            if old is None:
+                return
+            self._set(lid, (old[0] if on is None else on,
+                            old[1] if brightness is None else brightness))
+
+    def apply_group(self, group_id, on: bool | None = None,
+                    brightness: int | None = None, skip=()) -> None:
+        """Apply a group write to every member except the light ids in skip."""
+        with self._lock:
+            for lid in list(self.members.get(str(group_id), ())):
+                if lid not in skip:
+                    self.apply(lid, on=on, brightness=brightness)
+
+    def _set(self, lid: str, state: tuple[bool, int] | None) -> None:
+        old = self.states.get(lid)
+        if old == state:
+            return
+        for gid in self.groups_of.get(lid, ()):
+            if old is not None:
+                self._add(gid, old, -1)
+            if state is not None:
+                self._add(gid, state, 1)
+        if state is None:
+            del self.states[lid]
+        else:
+            self.states[lid] = state
+
+    def _add(self, gid: str, state: tuple[bool, int], sign: int) -> None:
+        on, bri = state
+        totals = self._totals[gid]
+        totals[0] += sign
+        totals[2] += sign * bri
+        if on:
+            totals[1] += sign
+            totals[3] += sign * bri
+
+    # -- queries -------------------------------------------------------
+
+    def aggregate(self, group_id) -> dict:
+        known, lit, bri_sum, lit_bri_sum = self._totals.get(str(group_id), (0, 0, 0, 0))
+        if lit:
+            avg = round(lit_bri_sum / lit)
+        elif known:
+            avg = round(bri_sum / known)
+        else:
+            avg = None
+        return {
+            "any_on": lit > 0,
+            "all_on": known > 0 and lit == known,
+            "avg_brightness": avg,
+        }
+
+    def annotate(self, groups: dict) -> dict:
+        """Copy of a get_groups result with aggregates merged in."""
+        with self._lock:
+            return {gid: {**group, **self.aggregate(gid)} for gid, group in groups.items()}
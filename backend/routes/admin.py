@@ -0,0 +1,31 @@
+"""Admin routes. Disabled unless "profiler_enabled" is set in the config."""
+
+import asyncio
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from backend import profiler
+
+router = APIRouter()
+
+
+def get_hub():
+    from backend.main import hub
+    return hub
+
+
+@router.get("/admin/profile")
+async def profile(seconds: float = 10, hz: int = 100):
+    config = await asyncio.to_thread(get_hub().load_config)
+    if not config.get("profiler_enabled"):
+        raise HTTPException(status_code=404, detail="Not found")
+    if not 0 < seconds <= 60 or not 1 <= hz <= 1000:
+        raise HTTPException(status_code=400, detail="seconds must be 0-60, hz 1-1000")
+    try:
+        folded = await asyncio.to_thread(profiler.sample, seconds, hz)
+    except profiler.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(
+        folded,
+        headers={"Content-Disposition": 'attachment; filename="irispanel.folded"'},
+    )
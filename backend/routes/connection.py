@@ -4,6 +4,7 @@ import asyncio
 from fastapi import APIRouter, HTTPException
 from phue import PhueRegistrationException
 
+from backend import discovery
 from backend.bridge import HueBridgeConnection
 from backend.models import ConnectRequest
 
@@ -21,8 +22,10 @@ async def status():
     config = await asyncio.to_thread(hub.load_config)
     return {
         "connected": hub.connected,
+        "connecting": hub.connecting,
         "bridge_ip": hub.bridge_ip,
         "saved_ip": config.get("bridge_ip"),
+        "bridge": hub.breaker.to_dict() if hub.connected else None,
     }
 
 
@@ -41,3 +44,11 @@ async def connect(req: ConnectRequest):
     except Exception as e:
         hub.bridge = None
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/discover")
+async def discover():
+    hub = get_hub()
+    found = await discovery.discover()
+    await asyncio.to_thread(hub.remember_bridges, found)
+    return [{"id": bid, "ip": ip} for bid, ip in sorted(found.items())]
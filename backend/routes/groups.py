@@ -3,6 +3,7 @@
 import asyncio
 from fastapi import APIRouter, HTTPException
 
+from backend.breaker import BridgeUnavailable
 from backend.bridge import ROOM_CLASSES
 from backend.models import GroupUpdate, CreateGroupRequest
 
@@ -23,10 +24,17 @@ def _require_connection():
 
 @router.get("/groups")
 async def get_groups():
-    hub = _require_connection()
+    hub = get_hub()
     try:
+        if not hub.connected:
+            raise BridgeUnavailable("Not connected")
         return await asyncio.to_thread(hub.get_groups)
     except Exception as e:
+        # Degraded mode: serve the last known state rather than an error
+        if hub.last_groups:
+            return hub.stale_groups()
+        if isinstance(e, BridgeUnavailable):
+            raise HTTPException(status_code=503, detail=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -39,6 +47,8 @@ async def create_group(body: CreateGroupRequest):
     try:
         result = await asyncio.to_thread(hub.create_group, body.name, body.lights, rc)
         return {"success": True, "group_id": result}
+    except BridgeUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -51,10 +61,15 @@ async def update_group(group_id: int, body: GroupUpdate):
             hub.update_group, group_id,
             on=body.on, brightness=body.brightness,
             hue=body.hue, sat=body.sat,
+            xy=body.xy, ct=body.ct, color=body.color,
             name=body.name, lights=body.lights,
             room_class=body.room_class,
         )
         return {"success": True}
+    except BridgeUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -65,6 +80,8 @@ async def delete_group(group_id: int):
     try:
         await asyncio.to_thread(hub.delete_group, group_id)
         return {"success": True}
+    except BridgeUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -3,6 +3,7 @@
 import asyncio
 from fastapi import APIRouter, HTTPException
 
+from backend.breaker import BridgeUnavailable
 from backend.models import LightUpdate
 
 router = APIRouter()
@@ -22,10 +23,17 @@ def _require_connection():
 
 @router.get("/lights")
 async def get_lights():
-    hub = _require_connection()
+    hub = get_hub()
     try:
+        if not hub.connected:
+            raise BridgeUnavailable("Not connected")
         return await asyncio.to_thread(hub.get_lights)
     except Exception as e:
+        # Degraded mode: serve the last known state rather than an error
+        if hub.last_lights:
+            return hub.stale_lights()
+        if isinstance(e, BridgeUnavailable):
+            raise HTTPException(status_code=503, detail=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -37,7 +45,12 @@ async def update_light(light_id: int, body: LightUpdate):
             hub.update_light, light_id,
             on=body.on, brightness=body.brightness,
             hue=body.hue, sat=body.sat,
+            xy=body.xy, ct=body.ct, color=body.color,
         )
         return {"success": True}
+    except BridgeUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
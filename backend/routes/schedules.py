@@ -0,0 +1,47 @@
+"""Schedule routes."""
+
+from fastapi import APIRouter, HTTPException
+
+from backend.models import CreateScheduleRequest, LocationRequest
+
+router = APIRouter()
+
+
+def get_scheduler():
+    from backend.main import scheduler
+    return scheduler
+
+
+def _with_next_run(scheduler, job: dict) -> dict:
+    return {**job, "next_run": scheduler.next_run(job["id"])}
+
+
+@router.get("/schedules")
+async def get_schedules():
+    scheduler = get_scheduler()
+    return [_with_next_run(scheduler, job) for job in scheduler.jobs.values()]
+
+
+@router.post("/schedules")
+async def create_schedule(body: CreateScheduleRequest):
+    scheduler = get_scheduler()
+    if body.action.target not in ("light", "group"):
+        raise HTTPException(status_code=400, detail="Target must be 'light' or 'group'")
+    try:
+        job = await scheduler.add(body.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "schedule": _with_next_run(scheduler, job)}
+
+
+@router.delete("/schedules/{schedule_id}")
+async def delete_schedule(schedule_id: str):
+    if not await get_scheduler().remove(schedule_id):
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return {"success": True}
+
+
+@router.put("/location")
+async def set_location(body: LocationRequest):
+    await get_scheduler().set_location(body.model_dump())
+    return {"success": True}
@@ -0,0 +1,370 @@
+"""Schedules and automations.
+
+Jobs live in a min-heap keyed by their next due time. The run loop sleeps
+until the earliest job is due (or until a job is added or removed), so an
+idle panel costs nothing however many rules exist. Jobs are persisted to
+disk with their last run time, and runs missed while the panel was off are
+caught up once at startup if they are recent enough.
+"""
+
+import asyncio
+import bisect
+import heapq
+import json
+import math
+import os
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from backend import colors
+
+SCHEDULE_FILE = Path.home() / ".irispanel_schedules.json"
+
+# Re-check the heap at least this often so wall-clock jumps (NTP sync on
+# boot, DST) cannot leave the loop asleep past a due job.
+MAX_SLEEP = 3600
+
+# A run this late still fires even when its catch-up window is zero
+LATE_GRACE = 60
+
+CRON_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+
+
+# -- triggers ----------------------------------------------------------
+
+def _parse_field(field: str, lo: int, hi: int) -> list[int]:
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_s = part.split("/", 1)
+            step = int(step_s)
+            if step < 1:
+                raise ValueError(f"Bad step in {field!r}")
+        if part == "*":
+            start, end = lo, hi
+        elif "-" in part:
+            start_s, end_s = part.split("-", 1)
+            start, end = int(start_s), int(end_s)
+        else:
+            start = end = int(part)
+            if step > 1:
+                end = hi
+        if start < lo or end > hi or start > end:
+            raise ValueError(f"Value out of range in {field!r}")
+        values.update(range(start, end + 1, step))
+    return sorted(values)
+
+
+class CronTrigger:
+    """Five-field cron expression: minute hour day-of-month month day-of-week."""
+
+    def __init__(self, expr: str):
+        expr = CRON_ALIASES.get(expr.strip(), expr)
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError("Cron expression needs 5 fields")
+        self.minutes = _parse_field(fields[0], 0, 59)
+        self.hours = _parse_field(fields[1], 0, 23)
+        self.days = set(_parse_field(fields[2], 1, 31))
+        self.months = set(_parse_field(fields[3], 1, 12))
+        # 0 and 7 are both Sunday
+        self.weekdays = {d % 7 for d in _parse_field(fields[4], 0, 7)}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _day_matches(self, d: datetime) -> bool:
+        if d.month not in self.months:
+            return False
+        dom = d.day in self.days
+        dow = (d.weekday() + 1) % 7 in self.weekdays
+        if self._any_day:
+            return dow
+        if self._any_weekday:
+            return dom
+        return dom or dow
+
+    def next_after(self, after: float) -> float | None:
+        t = datetime.fromtimestamp(after).replace(second=0, microsecond=0)
+        t += timedelta(minutes=1)
+        for _ in range(366 * 8):
+            if self._day_matches(t):
+                i = bisect.bisect_left(self.hours, t.hour)
+                for hour in self.hours[i:]:
+                    first = t.minute if hour == t.hour else 0
+                    j = bisect.bisect_left(self.minutes, first)
+                    if j < len(self.minutes):
+                        return t.replace(hour=hour, minute=self.minutes[j]).timestamp()
+            t = (t + timedelta(days=1)).replace(hour=0, minute=0)
+        return None
+
+
+def sun_event(day: date, lat: float, lon: float, event: str) -> float | None:
+    """Unix time of sunrise or sunset on day, or None during polar day/night."""
+    n = (day - date(2000, 1, 1)).days
+    j_star = n - lon / 360
+    m = math.radians((357.5291 + 0.98560028 * j_star) % 360)
+    c = 1.9148 * math.sin(m) + 0.0200 * math.sin(2 * m) + 0.0003 * math.sin(3 * m)
+    ecl = math.radians((math.degrees(m) + c + 180 + 102.9372) % 360)
+    transit = 2451545.0 + j_star + 0.0053 * math.sin(m) - 0.0069 * math.sin(2 * ecl)
+    decl = math.asin(math.sin(ecl) * math.sin(math.radians(23.4397)))
+    phi = math.radians(lat)
+    cos_w = ((math.sin(math.radians(-0.833)) - math.sin(phi) * math.sin(decl))
+             / (math.cos(phi) * math.cos(decl)))
+    if not -1 <= cos_w <= 1:
+        return None
+    w = math.degrees(math.acos(cos_w)) / 360
+    jd = transit - w if event == "sunrise" else transit + w
+    return (jd - 2440587.5) * 86400
+
+
+class SunTrigger:
+    """Sunrise or sunset, shifted by offset minutes."""
+
+    def __init__(self, event: str, offset: int, location: dict | None):
+        if event not in ("sunrise", "sunset"):
+            raise ValueError("Sun event must be 'sunrise' or 'sunset'")
+        if not location:
+            raise ValueError("Set a location before adding sun schedules")
+        self.event = event
+        self.offset = offset * 60
+        self.lat = float(location["lat"])
+        self.lon = float(location["lon"])
+
+    def next_after(self, after: float) -> float | None:
+        day = datetime.fromtimestamp(after).date() - timedelta(days=1)
+        for _ in range(368):
+            ts = sun_event(day, self.lat, self.lon, self.event)
+            if ts is not None and ts + self.offset > after:
+                return ts + self.offset
+            day += timedelta(days=1)
+        return None
+
+
+def check_action(action: dict) -> None:
+    """Reject actions the bridge would refuse each time the job fires."""
+    if action.get("xy") is not None:
+        colors.checked_xy(action["xy"])
+    if action.get("ct") is not None:
+        colors.check_ct(action["ct"])
+    if action.get("color") is not None:
+        colors.hex_to_rgb(action["color"])
+    for key in ("transition", "ramp_from"):
+        if action.get(key) is not None and action[key] < 0:
+            raise ValueError(f"{key} must not be negative")
+
+
+def make_trigger(spec: dict, location: dict | None):
+    if spec.get("type") == "cron":
+        return CronTrigger(spec.get("expr") or "")
+    if spec.get("type") == "sun":
+        return SunTrigger(spec.get("event"), spec.get("offset", 0), location)
+    raise ValueError(f"Unknown trigger type {spec.get('type')!r}")
+
+
+# -- scheduler ---------------------------------------------------------
+
+class Scheduler:
+    """Persistent job store plus a heap-driven run loop."""
+
+    def __init__(self, hub, path: Path = SCHEDULE_FILE):
+        self.hub = hub
+        self.path = path
+        self.jobs: dict[str, dict] = {}
+        self._triggers: dict[str, object] = {}
+        self._heap: list[tuple[float, str]] = []
+        self._due: dict[str, float] = {}
+        self._wake: asyncio.Event | None = None
+        self._dirty = False
+        self._tasks: set[asyncio.Task] = set()
+
+    # -- persistence ---------------------------------------------------
+
+    def load(self) -> list[dict]:
+        """Read jobs from disk. Returns jobs whose missed run should be caught up."""
+        try:
+            if self.path.exists():
+                with open(self.path, "r") as f:
+                    jobs = json.load(f).get("jobs", [])
+            else:
+                jobs = []
+        except Exception as e:
+            print(f"Could not read schedules: {e}")
+            jobs = []
+
+        now = time.time()
+        missed = []
+        location = self.hub.load_config().get("location")
+        for job in jobs:
+            if "id" not in job:
+                continue
+            # Kept even without a trigger (e.g. a sun job while the config
+            # is unreadable) so the next save does not erase it
+            self.jobs[job["id"]] = job
+            try:
+                self._triggers[job["id"]] = make_trigger(job["trigger"], location)
+            except (ValueError, KeyError) as e:
+                print(f"Not scheduling {job.get('name')!r}: {e}")
+                continue
+            if not job.get("enabled", True):
+                continue
+            trigger = self._triggers[job["id"]]
+            # Only a run inside the job's catch-up window is replayed
+            last = job.get("last_run") or job.get("created", now)
+            due = trigger.next_after(max(last, now - job.get("catch_up", 0)))
+            if due is not None and due <= now:
+                missed.append(job)
+            self._push(job["id"], trigger.next_after(now))
+        return missed
+
+    def _snapshot(self) -> dict:
+        return {"jobs": list(self.jobs.values())}
+
+    def _write(self, data: dict) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    async def save(self) -> None:
+        self._dirty = False
+        await asyncio.to_thread(self._write, self._snapshot())
+
+    # -- jobs ----------------------------------------------------------
+
+    def _push(self, job_id: str, due: float | None) -> None:
+        if due is None:
+            self._due.pop(job_id, None)
+            return
+        self._due[job_id] = due
+        heapq.heappush(self._heap, (due, job_id))
+        if self._wake is not None:
+            self._wake.set()
+
+    def next_run(self, job_id: str) -> float | None:
+        return self._due.get(job_id)
+
+    async def add(self, spec: dict) -> dict:
+        """Validate and store a new job. Raises ValueError on a bad trigger or action."""
+        config = await asyncio.to_thread(self.hub.load_config)
+        trigger = make_trigger(spec["trigger"], config.get("location"))
+        check_action(spec["action"])
+        job = {**spec, "id": uuid.uuid4().hex[:12], "created": time.time(), "last_run": None}
+        self.jobs[job["id"]] = job
+        self._triggers[job["id"]] = trigger
+        if job.get("enabled", True):
+            self._push(job["id"], trigger.next_after(time.time()))
+        await self.save()
+        return job
+
+    async def remove(self, job_id: str) -> bool:
+        if self.jobs.pop(job_id, None) is None:
+            return False
+        self._triggers.pop(job_id, None)
+        # Heap entries are dropped lazily when they surface
+        self._due.pop(job_id, None)
+        await self.save()
+        return True
+
+    async def set_location(self, location: dict) -> None:
+        """Store the panel location and reschedule sun-relative jobs."""
+        def store():
+            config = self.hub.load_config()
+            config["location"] = location
+            self.hub.save_config(config)
+
+        await asyncio.to_thread(store)
+        now = time.time()
+        # Includes sun jobs that could not be scheduled at load time
+        for job_id, job in self.jobs.items():
+            if job.get("trigger", {}).get("type") != "sun":
+                continue
+            try:
+                self._triggers[job_id] = make_trigger(job["trigger"], location)
+            except ValueError as e:
+                print(f"Not scheduling {job.get('name')!r}: {e}")
+                continue
+            if job.get("enabled", True):
+                self._push(job_id, self._triggers[job_id].next_after(now))
+
+    # -- running -------------------------------------------------------
+
+    async def dispatch(self, job: dict) -> None:
+        action = job["action"]
+        target = action.get("target")
+        update = self.hub.update_group if target == "group" else self.hub.update_light
+        transition = action.get("transition")
+        transitiontime = round(transition * 10) if transition is not None else None
+        try:
+            if not self.hub.connected:
+                raise RuntimeError("Not connected")
+            if action.get("ramp_from") is not None:
+                await asyncio.to_thread(update, action["id"], on=True,
+                                        brightness=action["ramp_from"])
+            await asyncio.to_thread(
+                update, action["id"],
+                on=action.get("on"), brightness=action.get("brightness"),
+                hue=action.get("hue"), sat=action.get("sat"),
+                xy=action.get("xy"), ct=action.get("ct"),
+                color=action.get("color"), transitiontime=transitiontime,
+            )
+        except Exception as e:
+            print(f"Schedule {job.get('name')!r} failed: {e}")
+
+    def _fire(self, job: dict, now: float) -> None:
+        job["last_run"] = now
+        self._dirty = True
+        task = asyncio.create_task(self.dispatch(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _catch_up(self, missed: list[dict], ready) -> None:
+        if ready is not None:
+            await asyncio.shield(ready)
+        now = time.time()
+        for job in missed:
+            print(f"Catching up missed schedule {job.get('name')!r}")
+            self._fire(job, now)
+        await self.save()
+
+    async def run(self, missed: list[dict] | None = None, ready=None) -> None:
+        """Run jobs forever. Missed jobs are replayed once ready completes."""
+        self._wake = asyncio.Event()
+        if missed:
+            task = asyncio.create_task(self._catch_up(missed, ready))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        while True:
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                due, job_id = heapq.heappop(self._heap)
+                if self._due.get(job_id) != due:
+                    continue
+                job = self.jobs[job_id]
+                # A clock jump (NTP sync on boot) can surface many stale
+                # entries at once; only fire those inside the catch-up window.
+                if now - due > max(job.get("catch_up", 0), LATE_GRACE):
+                    print(f"Skipping stale run of schedule {job.get('name')!r}")
+                else:
+                    self._fire(job, now)
+                self._push(job_id, self._triggers[job_id].next_after(max(now, due)))
+            if self._dirty:
+                await self.save()
+
+            timeout = MAX_SLEEP
+            if self._heap:
+                timeout = min(max(self._heap[0][0] - time.time(), 0), MAX_SLEEP)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
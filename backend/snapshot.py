@@ -0,0 +1,73 @@
+"""Last-known lights/groups snapshot on disk.
+
+Lets the panel paint immediately after a reboot, before the bridge has
+answered. Writes are atomic (temp file + rename) and happen at most once
+per MIN_INTERVAL, and only when the state has actually changed, to spare
+the Pi's SD card.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+SNAPSHOT_FILE = Path.home() / ".irispanel_snapshot.json"
+MIN_INTERVAL = 30
+
+
+class SnapshotStore:
+    def __init__(self, path: Path = SNAPSHOT_FILE,
+                 min_interval: float = MIN_INTERVAL):
+        self.path = path
+        self.min_interval = min_interval
+        self._state = {"lights": {}, "groups": {}}
+        self._written: str | None = None
+        self._last_write = float("-inf")
+        self._lock = threading.Lock()
+
+    def load(self) -> dict:
+        """Read the snapshot. Returns {"lights": ..., "groups": ..., "saved": ts}."""
+        try:
+            if self.path.exists():
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+                self._state = {"lights": data.get("lights", {}),
+                               "groups": data.get("groups", {})}
+                self._written = json.dumps(self._state)
+                return data
+        except Exception as e:
+            print(f"Could not read state snapshot: {e}")
+        return {}
+
+    def update(self, *, lights: dict | None = None,
+               groups: dict | None = None) -> None:
+        """Record fresh state; writes if it changed and the interval allows."""
+        with self._lock:
+            if lights is not None:
+                self._state["lights"] = lights
+            if groups is not None:
+                self._state["groups"] = groups
+            if time.monotonic() - self._last_write >= self.min_interval:
+                self._write()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._write()
+
+    def _write(self) -> None:
+        state = json.dumps(self._state)
+        if state == self._written:
+            return
+        tmp = self.path.with_suffix(".tmp")
+        try:
+            with open(tmp, "w") as f:
+                json.dump({**self._state, "saved": time.time()}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"Could not write state snapshot: {e}")
+            return
+        self._written = state
+        self._last_write = time.monotonic()
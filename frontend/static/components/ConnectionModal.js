@@ -1,5 +1,6 @@
 import { html, React } from '../lib.js';
 import { useBridge } from '../state.js';
+import { api } from '../api.js';
 
 const { useState } = React;
 
@@ -9,6 +10,8 @@ export default function ConnectionModal() {
     const [error, setError] = useState('');
     const [busy, setBusy] = useState(false);
     const [initialized, setInitialized] = useState(false);
+    const [found, setFound] = useState([]);
+    const [searching, setSearching] = useState(false);
 
     // Pre-fill saved IP once
     React.useEffect(() => {
@@ -18,7 +21,24 @@ export default function ConnectionModal() {
         }
     }, [savedIp, initialized]);
 
-    if (!initialChecked || connected) return null;
+    // Look for bridges on the LAN while the modal is showing
+    const visible = initialChecked && !connected;
+    React.useEffect(() => {
+        if (!visible) return;
+        let cancelled = false;
+        setSearching(true);
+        api('/api/discover')
+            .then(bridges => {
+                if (cancelled) return;
+                setFound(bridges);
+                if (bridges.length && !savedIp) setIp(bridges[0].ip);
+            })
+            .catch(() => {})
+            .finally(() => { if (!cancelled) setSearching(false); });
+        return () => { cancelled = true; };
+    }, [visible]);
+
+    if (!visible) return null;
 
     const handleConnect = async () => {
         const trimmed = ip.trim();
@@ -47,7 +67,7 @@ export default function ConnectionModal() {
                     </svg>
                 </div>
                 <h2 class="text-xl font-semibold mb-1">Connect to Hue Bridge</h2>
-                <p class="text-iris-muted text-sm mb-6">Enter your bridge IP address</p>
+                <p class="text-iris-muted text-sm mb-6">Pick a bridge found on your network or enter its IP address</p>
                 <input
                     type="text"
                     value=${ip}
@@ -57,6 +77,18 @@ export default function ConnectionModal() {
                     class="w-full px-4 py-3 rounded-xl bg-iris-bg border border-surface-border text-iris-text text-center text-lg outline-none focus:border-iris-accent transition"
                     autoFocus
                 />
+                ${searching && html`<p class="text-iris-dim text-xs mt-3">Searching for bridges...</p>`}
+                ${found.length > 0 && html`
+                    <div class="flex flex-wrap justify-center gap-2 mt-3">
+                        ${found.map(b => html`
+                            <button
+                                key=${b.id}
+                                onClick=${() => setIp(b.ip)}
+                                class="px-3 py-1 rounded-lg text-xs transition ${ip.trim() === b.ip ? 'bg-iris-accent text-white' : 'bg-surface-hover text-iris-muted hover:bg-surface-border'}"
+                            >${b.ip}</button>
+                        `)}
+                    </div>
+                `}
                 ${error && html`<p class="text-red-400 text-sm mt-3">${error}</p>`}
                 <button
                     onClick=${handleConnect}
@@ -1,17 +1,17 @@
 import { html } from '../lib.js';
 import { useBridge } from '../state.js';
-import { hsbToHex } from '../utils.js';
 
 export default function DeviceCard({ item, type, onSettings }) {
     const { toggleLight, toggleGroup } = useBridge();
 
-    const isOn = item.on;
-    const pct = Math.round((item.brightness / 254) * 100);
+    // Rooms use the aggregates computed from their member lights
+    const isGroup = type === 'group';
+    const isOn = isGroup ? (item.any_on ?? item.on) : item.on;
+    const brightness = isGroup ? (item.avg_brightness ?? item.brightness) : item.brightness;
+    const pct = Math.round((brightness / 254) * 100);
 
-    let glowColor = null;
-    if (isOn && item.has_color && item.hue != null) {
-        glowColor = hsbToHex(item.hue, item.sat || 254, 254);
-    }
+    // Display colour is computed server-side from xy / ct / hue-sat
+    const glowColor = isOn ? item.color || null : null;
 
     const handleToggle = (e) => {
         e.stopPropagation();
@@ -2,11 +2,11 @@ import { html } from '../lib.js';
 import { useBridge } from '../state.js';
 
 export default function Header({ onAddRoom }) {
-    const { connected, error, refresh } = useBridge();
+    const { connected, error, stale, refresh } = useBridge();
 
     const hasError = !!error;
-    const statusColor = hasError ? 'bg-amber-400' : connected ? 'bg-green-400 shadow-[0_0_6px_rgba(74,222,128,.6)]' : 'bg-red-400';
-    const statusText = hasError ? 'Error' : connected ? 'Connected' : 'Disconnected';
+    const statusColor = hasError || stale ? 'bg-amber-400' : connected ? 'bg-green-400 shadow-[0_0_6px_rgba(74,222,128,.6)]' : 'bg-red-400';
+    const statusText = hasError ? 'Error' : stale ? 'Reconnecting' : connected ? 'Connected' : 'Disconnected';
 
     return html`
         <header class="sticky top-0 z-40 bg-surface/80 backdrop-blur-md border-b border-surface-border">
@@ -1,6 +1,5 @@
 import { html, React } from '../lib.js';
 import { useBridge } from '../state.js';
-import { hsbToHex, hexToHsb } from '../utils.js';
 
 const { useState, useEffect, useCallback } = React;
 
@@ -26,7 +25,7 @@ export default function LightModal({ deviceId, deviceType, onClose }) {
 
     const handlePower = useCallback(() => {
         if (!item) return;
-        const data = { on: !item.on };
+        const data = { on: !(deviceType === 'group' ? (item.any_on ?? item.on) : item.on) };
         deviceType === 'light'
             ? updateLight(deviceId, data)
             : updateGroup(deviceId, data);
@@ -40,10 +39,10 @@ export default function LightModal({ deviceId, deviceType, onClose }) {
     }, [deviceId, deviceType, updateLight, updateGroup]);
 
     const handleColor = useCallback((e) => {
-        const { hue, sat } = hexToHsb(e.target.value);
+        const color = e.target.value;
         deviceType === 'light'
-            ? updateLight(deviceId, { hue, sat }, true)
-            : updateGroup(deviceId, { hue, sat }, true);
+            ? updateLight(deviceId, { color }, true)
+            : updateGroup(deviceId, { color }, true);
     }, [deviceId, deviceType, updateLight, updateGroup]);
 
     const handleSaveRoom = useCallback(async () => {
@@ -81,13 +80,11 @@ export default function LightModal({ deviceId, deviceType, onClose }) {
 
     if (!item) return null;
 
-    const pct = Math.round((item.brightness / 254) * 100);
-    let colorHex = '#ffffff';
-    if (item.has_color && item.hue != null && item.sat != null) {
-        colorHex = hsbToHex(item.hue, item.sat, item.brightness);
-    }
-
     const isGroup = deviceType === 'group';
+    const isOn = isGroup ? (item.any_on ?? item.on) : item.on;
+    const brightness = isGroup ? (item.avg_brightness ?? item.brightness) : item.brightness;
+    const pct = Math.round((brightness / 254) * 100);
+    const colorHex = item.color || '#ffffff';
 
     return html`
         <div class="fixed inset-0 z-50 flex items-center justify-center bg-black/70 backdrop-blur-sm p-2" onClick=${(e) => { if (e.target === e.currentTarget) onClose(); }}>
@@ -104,14 +101,14 @@ export default function LightModal({ deviceId, deviceType, onClose }) {
                     <div class="${isGroup ? 'flex-1' : 'w-64'}">
                         <!-- Header -->
                         <div class="flex items-center gap-3 mb-3">
-                            <div class="w-10 h-10 rounded-full ${item.on ? 'bg-amber-400 shadow-[0_0_20px_rgba(251,191,36,.5)]' : 'bg-white/[.07]'} flex items-center justify-center shrink-0 transition-all">
+                            <div class="w-10 h-10 rounded-full ${isOn ? 'bg-amber-400 shadow-[0_0_20px_rgba(251,191,36,.5)]' : 'bg-white/[.07]'} flex items-center justify-center shrink-0 transition-all">
                                 ${deviceType === 'light' ? html`
-                                    <svg class="w-5 h-5 ${item.on ? 'text-gray-900' : 'text-iris-muted'}" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+                                    <svg class="w-5 h-5 ${isOn ? 'text-gray-900' : 'text-iris-muted'}" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
                                         <path d="M9 18h6"/><path d="M10 22h4"/>
                                         <path d="M15.09 14c.18-.98.65-1.74 1.41-2.5A4.65 4.65 0 0 0 18 8 6 6 0 0 0 6 8c0 1 .23 2.23 1.5 3.5A4.61 4.61 0 0 1 8.91 14"/>
                                     </svg>
                                 ` : html`
-                                    <svg class="w-5 h-5 ${item.on ? 'text-gray-900' : 'text-iris-muted'}" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
+                                    <svg class="w-5 h-5 ${isOn ? 'text-gray-900' : 'text-iris-muted'}" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2">
                                         <rect x="3" y="3" width="7" height="7" rx="1"/><rect x="14" y="3" width="7" height="7" rx="1"/>
                                         <rect x="3" y="14" width="7" height="7" rx="1"/><rect x="14" y="14" width="7" height="7" rx="1"/>
                                     </svg>
@@ -125,7 +122,7 @@ export default function LightModal({ deviceId, deviceType, onClose }) {
                             <!-- Power -->
                             <div class="flex items-center justify-between">
                                 <span class="text-iris-muted text-sm">Power</span>
-                                <div class="toggle-track ${item.on ? 'on' : ''}" onClick=${handlePower}>
+                                <div class="toggle-track ${isOn ? 'on' : ''}" onClick=${handlePower}>
                                     <div class="toggle-thumb"></div>
                                 </div>
                             </div>
@@ -133,7 +130,7 @@ export default function LightModal({ deviceId, deviceType, onClose }) {
                             <!-- Brightness -->
                             <div class="flex items-center justify-between gap-3">
                                 <span class="text-iris-muted text-sm shrink-0">Brightness</span>
-                                <input type="range" min="1" max="254" value=${item.brightness} onInput=${handleBrightness} class="flex-1" />
+                                <input type="range" min="1" max="254" value=${brightness} onInput=${handleBrightness} class="flex-1" />
                                 <span class="text-sm font-medium w-10 text-right">${pct}%</span>
                             </div>
 
@@ -8,6 +8,17 @@ const { createContext, useContext, useState, useCallback, useRef, useEffect } =
 
 const BridgeContext = createContext(null);
 
+// Keep the server-computed room aggregates in step with optimistic updates
+function withAggregates(group, data) {
+    const next = { ...group, ...data };
+    if (data.on !== undefined) {
+        next.any_on = data.on;
+        next.all_on = data.on;
+    }
+    if (data.brightness !== undefined) next.avg_brightness = data.brightness;
+    return next;
+}
+
 export function useBridge() {
     return useContext(BridgeContext);
 }
@@ -21,16 +32,19 @@ export function BridgeProvider({ children }) {
     const [roomClasses, setRoomClasses] = useState([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
+    const [stale, setStale] = useState(false);
     const [initialChecked, setInitialChecked] = useState(false);
     const debounceRef = useRef(null);
 
     const checkStatus = useCallback(async () => {
         try {
             const status = await api('/api/status');
-            setConnected(status.connected);
+            // While the backend reconnects at boot it serves its last snapshot
+            const usable = status.connected || status.connecting;
+            setConnected(usable);
             setBridgeIp(status.bridge_ip);
             setSavedIp(status.saved_ip);
-            return status.connected;
+            return usable;
         } catch {
             return false;
         } finally {
@@ -50,6 +64,7 @@ export function BridgeProvider({ children }) {
             setLights(l);
             setGroups(g);
             setRoomClasses(rc);
+            setStale(Object.values(l).some(x => x.stale));
         } catch (e) {
             console.error('Failed to load data:', e);
             setError(e.message || 'Failed to load lights');
@@ -89,9 +104,9 @@ export function BridgeProvider({ children }) {
     const toggleGroup = useCallback(async (id) => {
         const group = groups[id];
         if (!group) return;
-        const newOn = !group.on;
+        const newOn = !(group.any_on ?? group.on);
 
-        setGroups(prev => ({ ...prev, [id]: { ...prev[id], on: newOn } }));
+        setGroups(prev => ({ ...prev, [id]: withAggregates(prev[id], { on: newOn }) }));
         // Optimistically update member lights
         setLights(prev => {
             const next = { ...prev };
@@ -108,7 +123,7 @@ export function BridgeProvider({ children }) {
                 body: JSON.stringify({ on: newOn }),
             });
         } catch {
-            setGroups(prev => ({ ...prev, [id]: { ...prev[id], on: !newOn } }));
+            setGroups(prev => ({ ...prev, [id]: withAggregates(prev[id], { on: !newOn }) }));
         }
     }, [groups]);
 
@@ -139,10 +154,10 @@ export function BridgeProvider({ children }) {
     }, []);
 
     const updateGroup = useCallback((id, data, debounce = false) => {
-        setGroups(prev => ({ ...prev, [id]: { ...prev[id], ...data } }));
+        setGroups(prev => ({ ...prev, [id]: withAggregates(prev[id], data) }));
 
         // If color change, also update member lights
-        if (data.hue !== undefined && data.sat !== undefined) {
+        if (data.color !== undefined) {
             setLights(prev => {
                 const group = groups[id];
                 if (!group) return prev;
@@ -150,7 +165,7 @@ export function BridgeProvider({ children }) {
                 (group.lights || []).forEach(lid => {
                     const numId = parseInt(lid);
                     if (next[numId] && next[numId].has_color) {
-                        next[numId] = { ...next[numId], hue: data.hue, sat: data.sat };
+                        next[numId] = { ...next[numId], color: data.color };
                     }
                 });
                 return next;
@@ -200,19 +215,21 @@ export function BridgeProvider({ children }) {
         await refresh();
     }, [refresh]);
 
-    // Auto-refresh every 3s when connected; skip if a debounced update is in flight
+    // Auto-refresh every 3s when connected; skip if a debounced update is in flight.
+    // While showing stale data, also re-check status in case reconnecting failed.
     useEffect(() => {
         if (!connected) return;
         const id = setInterval(() => {
             if (debounceRef.current) return;
+            if (stale) checkStatus();
             refresh(true);
         }, 3000);
         return () => clearInterval(id);
-    }, [connected, refresh]);
+    }, [connected, stale, checkStatus, refresh]);
 
     const value = {
         connected, bridgeIp, savedIp, lights, groups, roomClasses,
-        loading, error, initialChecked,
+        loading, error, stale, initialChecked,
         checkStatus, connect, refresh,
         toggleLight, toggleGroup, updateLight, updateGroup,
         createGroup, deleteGroup, updateGroupSettings,
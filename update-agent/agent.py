@@ -1,23 +1,36 @@
 #!/usr/bin/env python3
 """IrisPanel update agent — polls for new releases and applies them."""
 
+import argparse
 import hashlib
 import json
 import logging
+import os
+import random
+import re
 import shutil
+import signal
 import subprocess
 import sys
 import tarfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
 import httpx
 import websockets.sync.client as ws_client
 
 CONFIG_PATH = Path.home() / ".iris_updater_config.json"
+DEFAULT_CACHE_DIR = Path.home() / ".iris_updater_cache"
 
 log = logging.getLogger("iris-updater")
 
+# Stage timing for apply_update; set by --profile or toggled with SIGUSR1
+profiling = False
+
 
 def load_config() -> dict:
     if not CONFIG_PATH.exists():
@@ -38,6 +51,29 @@ def compute_sha256(path: Path) -> str:
     return h.hexdigest()
 
 
+@contextmanager
+def stage(name: str, timings: dict | None):
+    """Record how long a block takes when timings is not None."""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[name] = timings.get(name, 0) + time.monotonic() - start
+
+
+def toggle_profiling(signum, frame):
+    global profiling
+    profiling = not profiling
+    log.info("Update stage profiling %s", "enabled" if profiling else "disabled")
+
+
+def log_timings(version: int, timings: dict):
+    summary = " ".join(f"{name}={secs:.2f}s" for name, secs in timings.items())
+    log.info("Update %d stage timings: %s (total %.2fs)",
+             version, summary, sum(timings.values()))
+
+
 def check_latest(server_url: str) -> dict | None:
     try:
         resp = httpx.get(f"{server_url}/api/latest", timeout=15)
@@ -64,7 +100,199 @@ def download_release(server_url: str, version: int, dest: Path) -> bool:
         return False
 
 
-def apply_update(tarball: Path, version: int, config: dict) -> bool:
+def cached_releases(cache_dir: Path) -> list[dict]:
+    """Verified releases in the cache, oldest first."""
+    releases = []
+    for meta in cache_dir.glob("irispanel-*.json"):
+        try:
+            release = json.loads(meta.read_text())
+        except Exception:
+            continue
+        if (cache_dir / f"irispanel-{release['version']}.tar.gz").exists():
+            releases.append(release)
+    return sorted(releases, key=lambda r: r["version"])
+
+
+def cache_release(tarball: Path, release: dict, cache_dir: Path, keep: int) -> Path:
+    """Store a verified tarball for peers and prune old ones."""
+    version = release["version"]
+    dest = cache_dir / f"irispanel-{version}.tar.gz"
+    if tarball != dest:
+        tmp = dest.with_suffix(".part")
+        shutil.copyfile(tarball, tmp)
+        os.replace(tmp, dest)
+    # Metadata goes last: a release is only advertised once its file is complete
+    meta = cache_dir / f"irispanel-{version}.json"
+    tmp = meta.with_suffix(".part")
+    tmp.write_text(json.dumps(release))
+    os.replace(tmp, meta)
+
+    for old in cached_releases(cache_dir)[:-keep]:
+        (cache_dir / f"irispanel-{old['version']}.json").unlink(missing_ok=True)
+        (cache_dir / f"irispanel-{old['version']}.tar.gz").unlink(missing_ok=True)
+    return dest
+
+
+class MirrorHandler(BaseHTTPRequestHandler):
+    """Serves cached releases to peers.
+
+    /api/latest and /api/download/{version} match the update server;
+    /api/versions lists every cached version and exists only on mirrors.
+    """
+
+    def do_GET(self):
+        cache_dir = self.server.cache_dir
+        match = re.fullmatch(r"/api/download/(\d+)", self.path)
+        if self.path == "/api/versions":
+            self._send_json([r["version"] for r in cached_releases(cache_dir)])
+        elif self.path == "/api/latest":
+            releases = cached_releases(cache_dir)
+            if releases:
+                self._send_json(releases[-1])
+            else:
+                self._send_json({"detail": "No releases cached"}, status=404)
+        elif match and (cache_dir / f"irispanel-{match.group(1)}.json").exists():
+            tarball = cache_dir / f"irispanel-{match.group(1)}.tar.gz"
+            try:
+                f = open(tarball, "rb")
+            except OSError:
+                self._send_json({"detail": "Release not found"}, status=404)
+                return
+            with f:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/gzip")
+                self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+                self.end_headers()
+                shutil.copyfileobj(f, self.wfile)
+        else:
+            self._send_json({"detail": "Not found"}, status=404)
+
+    def _send_json(self, data, status: int = 200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        log.debug("mirror: " + format, *args)
+
+
+def start_mirror(cache_dir: Path, port: int):
+    server = ThreadingHTTPServer(("0.0.0.0", port), MirrorHandler)
+    server.cache_dir = cache_dir
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    log.info("Mirror serving %s on port %d", cache_dir, port)
+
+
+def check_peers_latest(peers: list[str], trusted: dict | None,
+                       allow_untrusted: bool = False) -> dict | None:
+    """Release to fetch from peers while the server is unreachable.
+
+    Peer copies are verified against the release's SHA-256, so the metadata
+    itself must come from the server: by default this is the last release
+    the server announced. Releases only peers know about are used when
+    allow_untrusted is set (offline installs on a trusted LAN).
+    """
+    if not allow_untrusted:
+        return trusted
+    best = None
+    for peer in peers:
+        try:
+            resp = httpx.get(f"{peer}/api/latest", timeout=5)
+            resp.raise_for_status()
+            release = resp.json()
+        except Exception:
+            continue
+        if not (isinstance(release, dict) and isinstance(release.get("version"), int)
+                and isinstance(release.get("sha256"), str)):
+            log.warning("Ignoring malformed release metadata from %s", peer)
+            continue
+        if best is None or release["version"] > best["version"]:
+            best = release
+    if best:
+        log.warning("Server unreachable; peers offer unverified version %d", best["version"])
+    return best
+
+
+def rank_peers(peers: list[str], version: int) -> list[str]:
+    """Peers that have version, fastest responder first."""
+    def probe(peer):
+        start = time.monotonic()
+        try:
+            resp = httpx.get(f"{peer}/api/versions", timeout=2)
+            resp.raise_for_status()
+            if version in resp.json():
+                return time.monotonic() - start, peer
+        except Exception:
+            pass
+        return None
+
+    if not peers:
+        return []
+    with ThreadPoolExecutor(max_workers=min(len(peers), 16)) as pool:
+        found = [r for r in pool.map(probe, peers) if r]
+    return [peer for _, peer in sorted(found)]
+
+
+def fetch_release(release: dict, server_url: str, config: dict,
+                  dest: Path, timings: dict | None) -> bool:
+    """Download a release from the nearest peer that has it, else the server.
+
+    Each source is checked against the release's SHA-256 before it is
+    accepted; a bad peer copy falls through to the next source.
+    """
+    version = release["version"]
+    peers = [p.rstrip("/") for p in config.get("peers", [])]
+    sources = rank_peers(peers, version)
+    if peers and not sources:
+        # Spread simultaneous updates out so one panel can seed the others
+        time.sleep(random.uniform(0, config.get("peer_jitter", 30)))
+        sources = rank_peers(peers, version)
+    sources.append(server_url)
+
+    for source in sources:
+        log.info("Downloading version %d from %s", version, source)
+        with stage("download", timings):
+            downloaded = download_release(source, version, dest)
+        if not downloaded:
+            continue
+        with stage("verify", timings):
+            actual_sha = compute_sha256(dest)
+        if actual_sha == release["sha256"]:
+            return True
+        log.error("SHA-256 mismatch from %s! Expected %s, got %s",
+                  source, release["sha256"], actual_sha)
+        dest.unlink(missing_ok=True)
+    return False
+
+
+def seed_mirror(release: dict, server_url: str, config: dict,
+                cache_dir: Path, keep: int) -> bool:
+    """Cache the installed release so peers can fetch it before the next update.
+
+    release must be metadata from the server, as for any other download.
+    """
+    version = release["version"]
+    if (cache_dir / f"irispanel-{version}.json").exists():
+        return True
+    tarball = Path(f"/tmp/irispanel-{version}-seed.tar.gz")
+    try:
+        if not fetch_release(release, server_url, config, tarball, None):
+            return False
+        cache_release(tarball, release, cache_dir, keep)
+    except OSError:
+        log.exception("Could not cache release %d for peers", version)
+        return False
+    finally:
+        tarball.unlink(missing_ok=True)
+    log.info("Mirror seeded with installed version %d", version)
+    return True
+
+
+def apply_update(tarball: Path, version: int, config: dict,
+                 timings: dict | None = None) -> bool:
     install_dir = Path(config["install_dir"])
     backup_dir = install_dir.parent / (install_dir.name + ".prev")
     service_name = config["service_name"]
@@ -77,7 +305,7 @@ def apply_update(tarball: Path, version: int, config: dict) -> bool:
     try:
         # Extract tarball
         log.info("Extracting %s", tarball.name)
-        with tarfile.open(tarball, "r:gz") as tar:
+        with stage("extract", timings), tarfile.open(tarball, "r:gz") as tar:
             tar.extractall(path=extract_dir)
 
         extracted_app = extract_dir / "irispanel"
@@ -87,52 +315,58 @@ def apply_update(tarball: Path, version: int, config: dict) -> bool:
 
         # Stop service
         log.info("Stopping %s", service_name)
-        subprocess.run(
-            ["sudo", "systemctl", "stop", service_name],
-            check=True, timeout=30,
-        )
+        with stage("stop", timings):
+            subprocess.run(
+                ["sudo", "systemctl", "stop", service_name],
+                check=True, timeout=30,
+            )
 
-        # Backup current install
-        if backup_dir.exists():
-            shutil.rmtree(backup_dir)
-        if install_dir.exists():
-            log.info("Backing up %s -> %s", install_dir, backup_dir)
-            shutil.move(str(install_dir), str(backup_dir))
+        with stage("move", timings):
+            # Backup current install
+            if backup_dir.exists():
+                shutil.rmtree(backup_dir)
+            if install_dir.exists():
+                log.info("Backing up %s -> %s", install_dir, backup_dir)
+                shutil.move(str(install_dir), str(backup_dir))
 
-        # Move new version into place
-        log.info("Installing new version")
-        shutil.move(str(extracted_app), str(install_dir))
+            # Move new version into place
+            log.info("Installing new version")
+            shutil.move(str(extracted_app), str(install_dir))
 
         # Copy venv from backup
         venv_backup = backup_dir / "venv"
         venv_dest = install_dir / "venv"
         if venv_backup.exists():
             log.info("Restoring venv")
-            shutil.copytree(str(venv_backup), str(venv_dest), symlinks=True)
+            with stage("venv", timings):
+                shutil.copytree(str(venv_backup), str(venv_dest), symlinks=True)
 
         # Install requirements
         pip_path = venv_dest / "bin" / "pip"
         req_path = install_dir / "requirements.txt"
         if pip_path.exists() and req_path.exists():
             log.info("Installing requirements")
-            subprocess.run(
-                [str(pip_path), "install", "-r", str(req_path)],
-                check=True, timeout=120,
-            )
+            with stage("pip", timings):
+                subprocess.run(
+                    [str(pip_path), "install", "-r", str(req_path)],
+                    check=True, timeout=120,
+                )
 
         # Start service
         log.info("Starting %s", service_name)
-        subprocess.run(
-            ["sudo", "systemctl", "start", service_name],
-            check=True, timeout=30,
-        )
+        with stage("start", timings):
+            subprocess.run(
+                ["sudo", "systemctl", "start", service_name],
+                check=True, timeout=30,
+            )
 
         # Health check
-        time.sleep(5)
-        result = subprocess.run(
-            ["systemctl", "is-active", service_name],
-            capture_output=True, text=True,
-        )
+        with stage("health_check", timings):
+            time.sleep(5)
+            result = subprocess.run(
+                ["systemctl", "is-active", service_name],
+                capture_output=True, text=True,
+            )
         if result.stdout.strip() != "active":
             log.error("Service failed to start after update")
             rollback(install_dir, backup_dir, service_name)
@@ -185,6 +419,17 @@ def rollback(install_dir: Path, backup_dir: Path, service_name: str):
 
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="log how long each update stage takes (SIGUSR1 toggles this)",
+    )
+    args = parser.parse_args()
+
+    global profiling
+    profiling = args.profile
+    signal.signal(signal.SIGUSR1, toggle_profiling)
+
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s [%(name)s] %(levelname)s: %(message)s",
@@ -194,34 +439,55 @@ def main():
     server_url = config["server_url"].rstrip("/")
     poll_interval = config.get("poll_interval", 60)
     current_version = config.get("current_version", 0)
+    peers = [p.rstrip("/") for p in config.get("peers", [])]
+
+    mirror = config.get("mirror", {})
+    cache_dir = None
+    if mirror.get("enabled"):
+        cache_dir = Path(mirror.get("cache_dir", DEFAULT_CACHE_DIR))
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        start_mirror(cache_dir, mirror.get("port", 5052))
+
+    # The mirror otherwise only fills from the next release this panel installs
+    seeded = cache_dir is None
 
     log.info("IrisPanel Update Agent started")
-    log.info("Server: %s | Poll: %ds | Current version: %d",
-             server_url, poll_interval, current_version)
+    log.info("Server: %s | Poll: %ds | Current version: %d | Peers: %d",
+             server_url, poll_interval, current_version, len(peers))
 
     while True:
         release = check_latest(server_url)
+        if release is not None:
+            if release != config.get("last_server_release"):
+                config["last_server_release"] = release
+                save_config(config)
+            if not seeded and release["version"] == current_version:
+                seeded = seed_mirror(release, server_url, config, cache_dir,
+                                     mirror.get("keep", 3))
+        elif peers:
+            release = check_peers_latest(peers, config.get("last_server_release"),
+                                         config.get("allow_peer_metadata", False))
 
         if release and release["version"] > current_version:
             version = release["version"]
             log.info("New version available: %d (current: %d)", version, current_version)
 
+            timings = {} if profiling else None
             tarball = Path(f"/tmp/irispanel-{version}.tar.gz")
-            if not download_release(server_url, version, tarball):
-                time.sleep(poll_interval)
-                continue
-
-            # Verify checksum
-            actual_sha = compute_sha256(tarball)
-            if actual_sha != release["sha256"]:
-                log.error("SHA-256 mismatch! Expected %s, got %s",
-                          release["sha256"], actual_sha)
-                tarball.unlink(missing_ok=True)
+            if not fetch_release(release, server_url, config, tarball, timings):
                 time.sleep(poll_interval)
                 continue
 
             log.info("Checksum verified, applying update")
-            if apply_update(tarball, version, config):
+            if cache_dir is not None:
+                try:
+                    cache_release(tarball, release, cache_dir, mirror.get("keep", 3))
+                except OSError:
+                    log.exception("Could not cache release %d for peers", version)
+            applied = apply_update(tarball, version, config, timings)
+            if timings is not None:
+                log_timings(version, timings)
+            if applied:
                 current_version = version
                 config["current_version"] = current_version
                 save_config(config)